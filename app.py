@@ -1,15 +1,14 @@
-from flask import Flask, request, jsonify, render_template
-from flask_socketio import SocketIO
+from quart import Quart, request, jsonify, render_template
+import socketio
+import uvicorn
 import asyncio
-import threading
-import pandas as pd
+import csv
 import os
-import json
+import orjson
 import time
-import signal
-import sys
-from nats.aio.client import Client as NATS
 import logging
+from dataclasses import dataclass
+from nats.aio.client import Client as NATS
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -22,86 +21,127 @@ class Config:
     MAX_MESSAGES = int(os.getenv('MAX_MESSAGES', 5))
     INQUIRY_SLEEP = float(os.getenv('INQUIRY_SLEEP', 0.150))
     CSV_PATH = os.getenv('CSV_PATH', 'colour_settings_csvs/camera_settings_60.csv')
-
-# Create Flask app
-app = Flask(__name__,
+    NATS_POOL_SIZE = int(os.getenv('NATS_POOL_SIZE', 4))
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING').upper()
+    INQUIRY_CACHE_TTL = float(os.getenv('INQUIRY_CACHE_TTL', 0.2))
+
+# Configure logging; per-message output is DEBUG so production (WARNING) skips it entirely
+logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+logger = logging.getLogger('magic_slider')
+if isinstance(logging.getLevelName(Config.LOG_LEVEL), int):
+    logger.setLevel(Config.LOG_LEVEL)
+else:
+    logger.setLevel(logging.WARNING)
+    logger.warning("Unknown LOG_LEVEL %r, using WARNING", Config.LOG_LEVEL)
+
+# Create Quart app; HTTP, Socket.IO and NATS all share the server's event loop
+app = Quart(__name__,
     template_folder='templates',    # Changed from 'frontend/templates'
     static_folder='static'         # Changed from 'frontend/static'
 )
-socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Configure logging
-class NoWarningsFilter(logging.Filter):
-    def filter(self, record):
-        return record.levelno != logging.WARNING
+class OrjsonCodec:
+    """json-module stand-in so python-socketio encodes packets with orjson (it expects str)."""
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        return orjson.dumps(obj).decode()
 
-log = logging.getLogger('werkzeug')
-log.setLevel(logging.INFO)
-log.addFilter(NoWarningsFilter())
+    @staticmethod
+    def loads(s, *args, **kwargs):
+        return orjson.loads(s)
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins="*", json=OrjsonCodec)
+asgi_app = socketio.ASGIApp(sio, app)
 
 # Load camera settings
 try:
-    camera_settings = pd.read_csv(Config.CSV_PATH)
-    max_slider_value = len(camera_settings['Slider Position'].unique()) - 1
+    with open(Config.CSV_PATH, newline='') as f:
+        rows = list(csv.DictReader(f))
+    max_slider_value = len({int(row['Slider Position']) for row in rows}) - 1
+
+    # Pre-build one settings dict per slider position so requests only do a tuple lookup
+    records = {int(row['Slider Position']): row for row in rows}
+    SETTINGS_BY_SLIDER = tuple(
+        {
+            "changeexposuremode": "1",
+            "exposuremode": "manual",
+            "iris": int(records[i]["iris"]),
+            "exposuregain": int(records[i]["exposuregain"]),
+            "shutterspeed": int(records[i]["shutterspeed"]),
+            "brightness": int(records[i]["brightness"])
+        }
+        for i in sorted(records)
+    )
 except Exception as e:
-    print(f"Error loading camera settings: {e}")
-    camera_settings = None
+    logger.error("Error loading camera settings: %s", e)
+    SETTINGS_BY_SLIDER = ()
     max_slider_value = 10  # Default value
 
-# NATS setup
-nats_client = NATS()
-event_loop = None
-shutdown_event = threading.Event()
-last_sent_messages = {}
-
-# Signal handler for graceful shutdown
-def signal_handler(signum, frame):
-    print("\nShutdown signal received. Cleaning up...")
-    shutdown_event.set()
-    
-    # Close NATS connection if it exists
-    if nats_client and nats_client.is_connected:
-        async def close_nats():
-            await nats_client.close()
-        if event_loop:
-            event_loop.create_task(close_nats())
-    
-    # Stop the Flask-SocketIO server
-    if socketio:
-        socketio.stop()
-    
-    print("Cleanup complete. Exiting...")
-    sys.exit(0)
-
-# Register signal handlers
-signal.signal(signal.SIGINT, signal_handler)  # Ctrl+C
-signal.signal(signal.SIGTERM, signal_handler) # Termination signal
+# NATS setup: a small pool of connections so cameras don't queue behind one socket.
+# The first connection also carries the inquiry-reply subscriptions.
+nats_clients = [NATS() for _ in range(max(1, Config.NATS_POOL_SIZE))]
+nats_client = nats_clients[0]
+background_tasks = set()  # Strong refs so fire-and-forget publishes aren't garbage collected
+
+# Topics and inquiry payloads never change, so build them once per camera
+CAMERA_NUMS = [str(n) for n in range(1, 7)]
+COLOUR_TOPICS = {n: f"colour-control.camera{n}" for n in CAMERA_NUMS}
+INQUIRY_TOPICS = {n: f"ptzcontrol.camera{n}" for n in CAMERA_NUMS}
+RESULT_TOPICS = {n: f"cam_setting.camera{n}" for n in CAMERA_NUMS}
+REPLY_TOPICS = {f"caminq.camera{n}": n for n in CAMERA_NUMS}
+INQUIRY_PAYLOADS = {n: orjson.dumps({"inqcam": n}) for n in CAMERA_NUMS}
+
+# (key in the camera's inquiry reply, key in the settings we sent)
+COMPARISON_MAP = (
+    ("ExposureMode", "exposuremode"),
+    ("ExposureIris", "iris"),
+    ("ExposureGain", "exposuregain"),
+    ("ExposureExposureTime", "shutterspeed"),
+    ("DigitalBrightLevel", "brightness")
+)
+
+@dataclass(slots=True)
+class CamState:
+    """What was last sent to a camera and whether the camera has confirmed it."""
+    settings: dict | None = None
+    payload: bytes | None = None
+    last_status: str | None = None
+    future: asyncio.Future | None = None  # Resolved by handle_camera_inquiry
+    confirmed_payload: bytes | None = None  # Last payload the camera confirmed...
+    confirmed_at: float = 0.0  # ...and when (time.monotonic())
+    task: asyncio.Task | None = None  # In-flight publish_batch_messages, cancelled by newer values
+
+# Indexed by camera number; slot 0 is unused
+CAM_STATES = [CamState() for _ in range(len(CAMERA_NUMS) + 1)]
 
 class CameraController:
-    def __init__(self, settings):
-        self.camera_settings = settings
+    def __init__(self, settings_by_slider):
+        self.settings_by_slider = settings_by_slider
+        # Wire format for each position, so publishing never re-encodes the table
+        self.payloads_by_slider = tuple(orjson.dumps(settings) for settings in settings_by_slider)
         self.last_sent_messages = {}
 
     def get_camera_settings(self, slider_value):
-        print(f"Getting camera settings for slider value: {slider_value}")
+        logger.debug("Getting camera settings for slider value: %s", slider_value)
         try:
-            settings = self.camera_settings.iloc[int(slider_value)]
-            return {
-                "changeexposuremode": "1",
-                "exposuremode": "manual",
-                "iris": int(settings["iris"]),
-                "exposuregain": int(settings["exposuregain"]),
-                "shutterspeed": int(settings["shutterspeed"]),
-                "brightness": int(settings["brightness"])
-            }
+            # Shared table entry; callers must not mutate it
+            return self.settings_by_slider[int(slider_value)]
         except Exception as e:
-            print(f"Error getting camera settings: {e}")
+            logger.error("Error getting camera settings: %s", e)
             return None
 
-camera_controller = CameraController(camera_settings)
+    def get_camera_payload(self, slider_value):
+        """Pre-encoded bytes of get_camera_settings(slider_value)."""
+        return self.payloads_by_slider[int(slider_value)]
+
+camera_controller = CameraController(SETTINGS_BY_SLIDER)
+
+def client_for(camera_num):
+    """Pick the pooled NATS connection for a camera (stable, so per-camera ordering holds)."""
+    return nats_clients[int(camera_num) % len(nats_clients)]
 
 async def publish_status_to_ui(camera_num, status_message, additional_data=None):
-    """Send the status message to the UI via WebSocket."""
+    """Send the status message to the UI via WebSocket (AsyncServer.emit is a real coroutine)."""
     try:
         status_data = {
             "camera": camera_num,
@@ -113,119 +153,144 @@ async def publish_status_to_ui(camera_num, status_message, additional_data=None)
         if additional_data:
             status_data.update(additional_data)
         
-        socketio.emit("status_update", status_data)
-        print(f"Emitted status update for camera {camera_num}: {status_message}")
+        await sio.emit("status_update", status_data)
+        logger.debug("Emitted status update for camera %s: %s", camera_num, status_message)
     except Exception as e:
-        print(f"Error emitting status update: {e}")
+        logger.error("Error emitting status update: %s", e)
 
-async def publish_batch_messages(topic, message, max_retries=None):
+async def publish_batch_messages(camera_num, payload, max_retries=None, superseded=False):
     """
-    Publishes a message and retries if settings aren't applied correctly.
+    Publishes colour settings to a camera and retries if they aren't applied correctly.
+    camera_num: Camera id as a string, e.g. "3"
+    payload: Pre-encoded message bytes, reused verbatim on every retry
     max_retries: Maximum number of retry attempts (from NATS message count setting)
+    superseded: This run replaced a cancelled one; tell the UI before starting
     """
     try:
         max_retries = max_retries if max_retries is not None else Config.MAX_MESSAGES
         retry_count = 0
         settings_applied = False
-        camera_num = topic.split('.')[-1].replace('camera', '')
+        client = client_for(camera_num)
+        state = CAM_STATES[int(camera_num)]
+        colour_topic = COLOUR_TOPICS[camera_num]
+        inquiry_topic = INQUIRY_TOPICS[camera_num]
+        inquiry_payload = INQUIRY_PAYLOADS[camera_num]
         
-        # Send initial status to disable reapply button during retries
-        if "colour-control" in topic:
+        if superseded:
             await publish_status_to_ui(
                 camera_num,
-                "Sending settings...",
+                "Settings superseded",
                 {
                     "retries_complete": False,
                     "settings_applied": False
                 }
             )
+
+        # Send initial status to disable reapply button during retries
+        await publish_status_to_ui(
+            camera_num,
+            "Sending settings...",
+            {
+                "retries_complete": False,
+                "settings_applied": False
+            }
+        )
         
+        # A camera that confirmed these exact bytes moments ago doesn't need asking again
+        if (payload == state.confirmed_payload
+                and time.monotonic() - state.confirmed_at < Config.INQUIRY_CACHE_TTL):
+            await client.publish(colour_topic, payload)
+            state.last_status = 'success'
+            settings_applied = True
+            logger.debug("Settings recently confirmed for camera %s, skipping inquiry", camera_num)
+
         while retry_count < max_retries and not settings_applied:
-            await nats_client.publish(topic, json.dumps(message).encode("utf-8"))
-            print(f"Attempt {retry_count + 1}/{max_retries} for camera {camera_num}")
+            # Register before publishing so a fast reply can't slip past us
+            inquiry_future = asyncio.get_running_loop().create_future()
+            state.future = inquiry_future
+
+            # publish() only appends to the client's pending buffer, so back-to-back these two
+            # go out in one socket write from the flusher. No explicit flush(): that would add
+            # a PING/PONG round trip to every attempt
+            await client.publish(colour_topic, payload)
+            await client.publish(inquiry_topic, inquiry_payload)
+            logger.debug("Attempt %d/%d for camera %s", retry_count + 1, max_retries, camera_num)
             
-            if "colour-control" in topic:
-                inquiry_topic = f"ptzcontrol.camera{camera_num}"
-                await nats_client.publish(
-                    inquiry_topic, 
-                    json.dumps({"inqcam": camera_num}).encode("utf-8")
-                )
-                
-                await asyncio.sleep(0.5)
-                
-                last_sent = last_sent_messages.get(str(camera_num))
-                if last_sent and last_sent.get('last_status') == 'success':
-                    settings_applied = True
-                    print(f"✓ Settings confirmed for camera {camera_num}")
-                    break
-            else:
+            # Wake up as soon as the camera replies, give up after 0.5s
+            try:
+                status = await asyncio.wait_for(inquiry_future, timeout=0.5)
+            except asyncio.TimeoutError:
+                status = None
+            finally:
+                if state.future is inquiry_future:
+                    state.future = None
+
+            if status == 'success':
+                settings_applied = True
+                logger.debug("Settings confirmed for camera %s", camera_num)
                 break
             
             retry_count += 1
-            if not settings_applied:
-                print(f"✗ Settings not confirmed for camera {camera_num}")
-                # Send status update without enabling reapply button
-                if "colour-control" in topic:
-                    await publish_status_to_ui(
-                        camera_num,
-                        f"Settings not confirmed (Attempt {retry_count}/{max_retries})",
-                        {
-                            "retries_complete": False,
-                            "settings_applied": False
-                        }
-                    )
-                await asyncio.sleep(0.1)
+            # No UI update per attempt: "Sending settings..." already holds the reapply button
+            # and the final status below is the only outcome the UI acts on
+            logger.debug("Settings not confirmed for camera %s (attempt %d/%d)", camera_num, retry_count, max_retries)
+            await asyncio.sleep(0.1)
         
         # After all retries, send final status to enable reapply button if needed
-        if "colour-control" in topic:
-            final_status = "Settings applied successfully" if settings_applied else "Settings mismatch detected"
-            await publish_status_to_ui(
-                camera_num,
-                final_status,
-                {
-                    "retries_complete": True,
-                    "settings_applied": settings_applied
-                }
-            )
+        final_status = "Settings applied successfully" if settings_applied else "Settings mismatch detected"
+        await publish_status_to_ui(
+            camera_num,
+            final_status,
+            {
+                "retries_complete": True,
+                "settings_applied": settings_applied
+            }
+        )
             
-        if not settings_applied and "colour-control" in topic:
-            print(f"! Failed to apply settings to camera {camera_num} after {max_retries} attempts")
+        if not settings_applied:
+            logger.warning("Failed to apply settings to camera %s after %d attempts", camera_num, max_retries)
             
     except Exception as e:
-        print(f"Error in publish_batch_messages: {e}")
+        logger.error("Error in publish_batch_messages: %s", e)
 
 async def handle_camera_inquiry(msg):
     try:
-        received_data = json.loads(msg.data.decode())
-        camera_num = msg.subject.split('.')[-1].replace('camera', '')
+        received_data = orjson.loads(msg.data)
+        camera_num = REPLY_TOPICS[msg.subject]
         
-        last_sent = last_sent_messages.get(str(camera_num))
+        state = CAM_STATES[int(camera_num)]
+        last_sent = state.settings
         if not last_sent:
             return
 
-        comparison_map = {
-            "ExposureMode": "exposuremode",
-            "ExposureIris": "iris",
-            "ExposureGain": "exposuregain",
-            "ExposureExposureTime": "shutterspeed",
-            "DigitalBrightLevel": "brightness"
-        }
-
         mismatches = {}
-        for received_key, sent_key in comparison_map.items():
-            if sent_key in last_sent:
-                sent_value = str(last_sent[sent_key]).lower()
-                received_value = str(received_data.get(received_key, '')).lower()
-                if sent_value != received_value:
-                    mismatches[sent_key] = {
-                        'sent': sent_value,
-                        'received': received_value
-                    }
-
-        # Update the last_sent_messages with the status
-        last_sent_messages[str(camera_num)]['last_status'] = 'success' if not mismatches else 'mismatch'
-
-        result_topic = f"cam_setting.camera{camera_num}"
+        for received_key, sent_key in COMPARISON_MAP:
+            sent_value = str(last_sent[sent_key])
+            received_value = str(received_data.get(received_key, ''))
+            # Only the mode is free text; the numeric CSV values are already canonical
+            if received_key == "ExposureMode":
+                received_value = received_value.lower()
+            if sent_value != received_value:
+                mismatches[sent_key] = {
+                    'sent': sent_value,
+                    'received': received_value
+                }
+
+        # Update the camera state with the status
+        status = 'success' if not mismatches else 'mismatch'
+        state.last_status = status
+        if status == 'success':
+            state.confirmed_payload = state.payload
+            state.confirmed_at = time.monotonic()
+        else:
+            state.confirmed_payload = None
+
+        # Wake the publisher waiting on this camera's inquiry
+        inquiry_future, state.future = state.future, None
+        if inquiry_future and not inquiry_future.done():
+            inquiry_future.set_result(status)
+
+        result_topic = RESULT_TOPICS[camera_num]
         result_message = {
             "timestamp": time.time(),
             "camera": camera_num,
@@ -233,55 +298,100 @@ async def handle_camera_inquiry(msg):
             "mismatches": mismatches if mismatches else None
         }
 
-        await nats_client.publish(
+        await client_for(camera_num).publish(
             result_topic,
-            json.dumps(result_message).encode('utf-8')
+            orjson.dumps(result_message)
         )
 
         # Don't send UI updates from here - let publish_batch_messages handle all UI updates
         # This prevents premature enabling of the reapply button
 
     except Exception as e:
-        print(f"Error handling camera inquiry: {e}")
+        logger.error("Error handling camera inquiry: %s", e)
+
+async def nats_error_cb(e):
+    """Route nats-py's per-attempt errors through our logger instead of its traceback dump."""
+    logger.warning("NATS error: %s", e)
 
 async def setup_nats():
     try:
-        await nats_client.connect(servers=[Config.NATS_SERVER])
-        print("Connected to NATS server successfully")
+        # With max_reconnect_attempts=-1 nats-py keeps retrying even the first connect until
+        # the server is reachable, so this must only ever run as a background task (startup).
+        # asyncio already sets TCP_NODELAY on its TCP transports, so no socket tweaks here
+        results = await asyncio.gather(*(
+            client.connect(
+                servers=[Config.NATS_SERVER],
+                allow_reconnect=True,
+                max_reconnect_attempts=-1,
+                pending_size=2**22,
+                flusher_queue_size=1024,
+                pedantic=False,
+                error_cb=nats_error_cb
+            )
+            for client in nats_clients
+        ), return_exceptions=True)
+
+        # All or nothing: a half-connected pool would strand the cameras mapped to the dead ones.
+        # Connection errors are retried above, so this only catches non-retryable failures
+        # such as a malformed NATS_SERVER
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            for client in nats_clients:
+                if not client.is_closed:
+                    await client.close()
+            raise errors[0]
+        logger.info("Connected to NATS server successfully (%d connections)", len(nats_clients))
         
-        for camera_num in range(1, 7):
-            topic = f"caminq.camera{camera_num}"
+        for topic in REPLY_TOPICS:
             await nats_client.subscribe(topic, cb=handle_camera_inquiry)
-            print(f"✅ Subscribed to {topic}")
+            logger.info("Subscribed to %s", topic)
     except Exception as e:
-        print(f"Failed to setup NATS: {e}")
-        raise
-
-def start_nats_loop():
-    global event_loop
+        logger.error("Failed to setup NATS: %s", e)
+
+@app.before_serving
+async def startup():
+    # Connect in the background so HTTP comes up even while NATS is unreachable, like the
+    # old NATS thread did; until then /slider_value answers "NATS not connected"
+    task = asyncio.create_task(setup_nats())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def drain_nats(client, timeout=2.0):
+    """Flush pending publishes and close; fall back to close() if the server is unresponsive."""
+    if client.is_closed:
+        return
+    # Connecting/reconnecting clients have nothing to flush, but close() still has to stop
+    # their reconnect loop before the event loop goes away
+    if not client.is_connected:
+        await client.close()
+        return
     try:
-        event_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(event_loop)
-        event_loop.run_until_complete(setup_nats())
-        
-        # Run event loop with shutdown check
-        while not shutdown_event.is_set():
-            event_loop.run_until_complete(asyncio.sleep(0.1))
-            
-        # Clean shutdown of event loop
-        event_loop.stop()
-        event_loop.close()
+        await asyncio.wait_for(client.drain(), timeout=timeout)
     except Exception as e:
-        print(f"Error in NATS loop: {e}")
+        logger.warning("NATS drain failed, closing instead: %s", e)
+        await client.close()
+
+@app.after_serving
+async def shutdown():
+    logger.info("Shutting down. Cleaning up...")
+
+    # Runs inside the serving loop after uvicorn has handled SIGINT/SIGTERM, so the
+    # retry loops can be stopped directly before their connections go away
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    await asyncio.gather(*(drain_nats(client) for client in nats_clients))
+    logger.info("Cleanup complete. Exiting...")
 
 @app.route('/')
-def index():
-    return render_template('index.html', max_slider_value=max_slider_value)
+async def index():
+    return await render_template('index.html', max_slider_value=max_slider_value)
 
 @app.route('/slider_value', methods=['POST'])
-def handle_slider():
+async def handle_slider():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         slider_value = data.get("slider_value")
         camera_nums = data.get("camera_num")
         
@@ -289,51 +399,79 @@ def handle_slider():
         if not isinstance(camera_nums, list):
             camera_nums = [camera_nums]
 
+        camera_nums = [str(camera_num) for camera_num in camera_nums]
+        unknown = [camera_num for camera_num in camera_nums if camera_num not in COLOUR_TOPICS]
+        if unknown:
+            return jsonify({"status": "failed", "error": f"Unknown camera(s): {', '.join(unknown)}"}), 400
+
+        # Every camera gets the same slider position, so look it up once
+        settings = camera_controller.get_camera_settings(slider_value)
+        if not settings:
+            return jsonify({"status": "failed", "error": "Could not get camera settings"}), 500
+
+        # Each camera publishes over its own pooled connection, so check the one it will use
+        if not all(client_for(camera_num).is_connected for camera_num in camera_nums):
+            return jsonify({"status": "failed", "error": "NATS not connected"}), 500
+
+        # Encoded at load time; the retry loops republish these exact bytes
+        payload = camera_controller.get_camera_payload(slider_value)
+
         responses = []
         for camera_num in camera_nums:
-            camera_num = str(camera_num)
-            colour_topic = f"colour-control.camera{camera_num}"
-            
-            settings = camera_controller.get_camera_settings(slider_value)
-            if not settings:
-                return jsonify({"status": "failed", "error": "Could not get camera settings"}), 500
-
-            # Initialize the settings with status
-            settings['last_status'] = 'pending'
-            last_sent_messages[camera_num] = settings
+            state = CAM_STATES[int(camera_num)]
+
+            # Latest value wins: stop retrying whatever this camera was still being sent, and
+            # wait for it to finish so none of its status updates land after the new run's.
+            # Loop because a concurrent request may have started another run meanwhile; there
+            # must be no await between the final check and assigning state.task below
+            superseded = False
+            while state.task and not state.task.done():
+                old_task = state.task
+                old_task.cancel()
+                await asyncio.gather(old_task, return_exceptions=True)
+                superseded = True
+            if superseded:
+                logger.debug("Settings for camera %s superseded by a newer value", camera_num)
+
+            # Initialize the camera state with the settings being sent. A confirmation of
+            # some other payload stops being true the moment this one goes out
+            if state.confirmed_payload != payload:
+                state.confirmed_payload = None
+            state.settings = settings
+            state.payload = payload
+            state.last_status = 'pending'
 
             # Log the message being sent
-            print(f"Sending message to API for camera {camera_num}: {settings}")
-
-            if nats_client.is_connected:
-                # Create and store the coroutine for each camera
-                asyncio.run_coroutine_threadsafe(
-                    publish_batch_messages(
-                        colour_topic, 
-                        settings,
-                        Config.MAX_MESSAGES
-                    ),
-                    event_loop
+            logger.debug("Sending message to API for camera %s: %s", camera_num, settings)
+
+            # Run the publish/retry loop in the background so the response isn't held up
+            state.task = asyncio.create_task(
+                publish_batch_messages(
+                    camera_num,
+                    payload,
+                    Config.MAX_MESSAGES,
+                    superseded
                 )
-                
-                responses.append({
-                    "camera": camera_num,
-                    "status": "success",
-                    "message_sent": settings
-                })
-            else:
-                return jsonify({"status": "failed", "error": "NATS not connected"}), 500
+            )
+            background_tasks.add(state.task)
+            state.task.add_done_callback(background_tasks.discard)
+
+            responses.append({
+                "camera": camera_num,
+                "status": "success",
+                "message_sent": {**settings, "last_status": state.last_status}
+            })
 
         return jsonify({"status": "success", "responses": responses})
 
     except Exception as e:
-        print(f"Error handling slider: {e}")
+        logger.error("Error handling slider: %s", e)
         return jsonify({"status": "failed", "error": str(e)}), 500
 
 @app.route('/update_nats_count', methods=['POST'])
-def update_nats_count():
+async def update_nats_count():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         msg_count = data.get("msg_count")
         
         if msg_count is None or msg_count < 1 or msg_count > 20:
@@ -343,7 +481,7 @@ def update_nats_count():
             }), 400
             
         Config.MAX_MESSAGES = int(msg_count)
-        print(f"Updated maximum retry attempts to {msg_count}")
+        logger.info("Updated maximum retry attempts to %s", msg_count)
         return jsonify({
             "status": "success",
             "message": f"Maximum retry attempts set to {msg_count}"
@@ -353,29 +491,17 @@ def update_nats_count():
 
 def start_app():
     try:
-        # Start NATS in a separate thread
-        nats_thread = threading.Thread(target=start_nats_loop, daemon=True)
-        nats_thread.start()
-        
-        # Start Flask-SocketIO with graceful shutdown support
-        socketio.run(app, 
-            host='0.0.0.0', 
-            port=Config.PORT, 
-            debug=False, 
-            use_reloader=False,
-            log_output=False,
-            allow_unsafe_werkzeug=True  # Added for better signal handling
+        # Equivalent to `uvicorn app:asgi_app`; uvicorn picks uvloop/httptools when installed
+        # and handles SIGINT/SIGTERM, running after_serving on the way out
+        uvicorn.run(asgi_app,
+            host='0.0.0.0',
+            port=Config.PORT,
+            loop='auto',
+            http='auto',
+            access_log=False
         )
     except Exception as e:
-        print(f"Error starting app: {e}")
-    finally:
-        # Ensure cleanup happens
-        if not shutdown_event.is_set():
-            signal_handler(signal.SIGINT, None)
+        logger.error("Error starting app: %s", e)
 
 if __name__ == '__main__':
-    try:
-        start_app()
-    except KeyboardInterrupt:
-        print("\nKeyboard interrupt received")
-        signal_handler(signal.SIGINT, None)
\ No newline at end of file
+    start_app()